@@ -1,4 +1,5 @@
 from flask import Flask
+from jinja2 import FileSystemBytecodeCache
 from views import views
 
 
@@ -6,5 +7,11 @@ from views import views
 app = Flask(__name__)
 app.register_blueprint(views, url_prefix='/')
 
+# Compiled templates are kept on disk (in the system's temporary directory), so
+# a new process doesn't parse and compile them again; the transactions page is
+# loaded up front.
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+app.jinja_env.get_template('transactions.html')
+
 if __name__ == "__main__":
     app.run(debug=True, port=8000)
@@ -1,3 +1,4 @@
+import functools
 import json
 
 
@@ -89,6 +90,22 @@ class Config:
             self._tags.sort()
         return t
 
+    def add_new_categories(self, categories) -> None:
+        '''Adds the new ones among "categories", sorting the list once'''
+        new = {c.lower().capitalize() for c in categories} - \
+            set(self._categories) - {'Nan', ''}
+        if new:
+            self._categories.extend(new)
+            self._categories.sort()
+
+    def add_new_tags(self, tags) -> None:
+        '''Adds the new ones among "tags", sorting the list once'''
+        new = {t.lower().capitalize() for t in tags} - \
+            set(self._tags) - {'Nan', ''}
+        if new:
+            self._tags.extend(new)
+            self._tags.sort()
+
     def del_category(self, category: str) -> None:
         self._categories.remove(category)
 
@@ -96,9 +113,10 @@ class Config:
         self._tags.remove(tag)
 
     @staticmethod
-    def headers() -> list:
-        '''Returns the transactions DataFrame headers list'''
-        return ['id',
+    @functools.lru_cache(maxsize=1)
+    def headers() -> tuple:
+        '''Returns the transactions DataFrame headers'''
+        return ('id',
                 'time',
                 'input',
                 'type',
@@ -115,7 +133,49 @@ class Config:
                 'link',
                 'category',
                 'tags'
-                ]
+                )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def public_headers() -> tuple:
+        '''Returns the headers of the transactions columns shown to the user'''
+        return ('id',
+                'time',
+                'input',
+                'type',
+                'source',
+                'source_id',
+                'desc',
+                'amount',
+                'fee',
+                'total',
+                'curr',
+                'note',
+                'category',
+                'tags'
+                )
+
+    @staticmethod
+    def dtypes() -> dict:
+        '''Returns the transactions DataFrame columns dtypes, by header'''
+        return {'id': 'Int64',
+                'time': 'datetime64[ns]',
+                'input': 'category',
+                'type': 'category',
+                'source': 'category',
+                'source_id': 'category',
+                'desc': 'object',
+                'amount': 'float64',
+                'fee': 'float64',
+                'total': 'float64',
+                'curr': 'category',
+                'note': 'object',
+                'system': 'object',
+                'allot': 'Int64',
+                'link': 'Int64',
+                'category': 'category',
+                'tags': 'object'
+                }
 
     def save(self) -> bool:
         config = {
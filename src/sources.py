@@ -155,6 +155,10 @@ class Sources:
 
         self._sources = []
 
+        # Sources indexed by their lower-cased names, for case-insensitive
+        # lookups without scanning the list.
+        self._sources_by_name = {}
+
         # 'Config' is a Singleton class. self._cfg attributes' values will update
         # if the Config object is modified anywhere else. This is specially
         # important to keep the path to the files always actual.
@@ -181,6 +185,7 @@ class Sources:
                 [src.add_stmt_column_mapping(m['src'], m['dst'])
                     for m in s['stmt_columns_mapping']]
                 self._sources.append(src)
+                self._sources_by_name[src.name.lower()] = src
 
     @property
     def sources(self):
@@ -202,12 +207,14 @@ class Sources:
 
     def add_source(self, src: Source) -> None:
 
-        for s in self._sources:
-            if src.name == s.name:
-                raise SourcesException(
-                    "There is already a source named '{}'".format(src.name))
+        # Names are unique regardless the case; otherwise, case-insensitive
+        # lookups would be ambiguous.
+        if src.name.lower() in self._sources_by_name:
+            raise SourcesException(
+                "There is already a source named '{}'".format(src.name))
 
         self._sources.append(src)
+        self._sources_by_name[src.name.lower()] = src
         self.save()
 
     def backup(self) -> None:
@@ -222,12 +229,19 @@ class Sources:
             f.write(json.dumps(srcs_json, indent=4))
         return True
 
+    def find_source(self, name: str) -> Source:
+        '''
+        Returns the Source object named as the argument, regardless the case, or
+        None if there is no such source.
+        '''
+        return self._sources_by_name.get(name.lower())
+
     def get_source(self, name: str) -> Source:
         '''
         Returns the Source object with the name passed as argument.
         '''
-        src = [s for s in self._sources if s.name == name]
-        return src[0] if len(src) > 0 else []
+        src = self._sources_by_name.get(name.lower())
+        return src if src is not None and src.name == name else []
 
     def reset(self) -> None:
         '''
@@ -235,6 +249,7 @@ class Sources:
         '''
         self.backup()
         self._sources.clear()
+        self._sources_by_name.clear()
 
     def save(self) -> None:
         srcs_json = {
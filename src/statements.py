@@ -49,16 +49,16 @@ class StatementsParser:
                         self._stmt[c] = self._stmt[c].astype(object)
 
                     # 3. fill up the empty rows
-                    [self._stmt[c].fillna('No ' + c, inplace=True)
-                     for c in src_stmt_col]
+                    for c in src_stmt_col:
+                        self._stmt[c] = self._stmt[c].fillna('No ' + c)
 
                     # 4. combine the columns
                     self._df[dst_df_col] = self._stmt[src_stmt_col].agg(
                         ' - '.join, axis=1)
                     return
 
-            [self._stmt[c].fillna(0, inplace=True)
-             for c in src_stmt_col]
+            for c in src_stmt_col:
+                self._stmt[c] = self._stmt[c].fillna(0)
             self._df[dst_df_col] = self._stmt[src_stmt_col].sum(axis=1)
 
     def fill_up_column(self, dst_df_col: str, value: str) -> None:
@@ -76,8 +76,8 @@ class StatementsParser:
         '''
         # Convert all the fee entries to negative, if they are positive; then,
         # fill up the 'total' column
-        self._df['amount'].fillna(0, inplace=True)
-        self._df['fee'].fillna(0, inplace=True)
+        self._df['amount'] = self._df['amount'].fillna(0)
+        self._df['fee'] = self._df['fee'].fillna(0)
         self._df.loc[self._df['fee'] > 0, 'fee'] = self._df['fee'] * -1
         self._df['total'] = self._df[['amount', 'fee']].sum(axis=1)
 
@@ -41,14 +41,14 @@ def db_columns_update():
                ]
 
     new_df = pd.DataFrame(columns=headers)
-    old_df = pd.read_csv(cfg.db_dir + 'transactions.csv', sep='|')
+    old_df = pd.read_parquet(cfg.db_dir + 'transactions.parquet')
 
     for h in headers:
         if h in old_df.columns.values:
             new_df[h] = old_df[h]
 
-    new_df.to_csv(cfg.db_dir + 'transactions.csv',
-                  sep='|', index=False)
+    new_df.to_parquet(cfg.db_dir + 'transactions.parquet',
+                      compression='zstd', index=False)
 
 
 def migrate_colum(col_a, col_b):
@@ -57,12 +57,12 @@ def migrate_colum(col_a, col_b):
     '''
 
     cfg = Config('../data/db')
-    df = pd.read_csv(cfg.db_dir + 'transactions.csv', sep='|')
+    df = pd.read_parquet(cfg.db_dir + 'transactions.parquet')
 
     df[col_b] = df[col_a]
 
-    df.to_csv(cfg.db_dir + 'transactions.csv',
-              sep='|', index=False)
+    df.to_parquet(cfg.db_dir + 'transactions.parquet',
+                  compression='zstd', index=False)
 
 
 def set_id():
@@ -72,14 +72,14 @@ def set_id():
     '''
 
     cfg = Config('../data/db')
-    df = pd.read_csv(cfg.db_dir + 'transactions.csv', sep='|')
+    df = pd.read_parquet(cfg.db_dir + 'transactions.parquet')
 
     for i in range(0, len(df)):
         if pd.isna(df.loc[i, 'id']) or df.loc[i, 'id'] == 0:
             df.loc[i, 'id'] = df['id'].max() + 1
 
-    df.to_csv(cfg.db_dir + 'transactions.csv',
-              sep='|', index=False)
+    df.to_parquet(cfg.db_dir + 'transactions.parquet',
+                  compression='zstd', index=False)
 
 
 if __name__ == "__main__":
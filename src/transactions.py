@@ -1,16 +1,115 @@
+import os
+import numpy as np
 import pandas as pd
 import re
 import json
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
 
 from config import Config
 from sources import Sources, Source
 from utils import datetime_for_filename, StdReturn
 
 
+# The headers and dtypes are constant; building them (and a pandas Index and an
+# empty DataFrame from them) once spares the allocations at every DataFrame
+# creation and column selection.
+_HEADERS = list(Config.headers())
+_HEADERS_INDEX = pd.Index(_HEADERS)
+_DTYPES = Config.dtypes()
+
+# The free-text columns are backed by Arrow strings, so that their string
+# methods and "_contains()" run on Arrow's kernels instead of Python objects.
+_DTYPES.update(desc='string[pyarrow]', note='string[pyarrow]')
+
+_EMPTY_DF = pd.DataFrame({h: pd.Series(dtype=d) for h, d in _DTYPES.items()})
+_EMPTY_DF['_ntags'] = pd.Series(dtype=int)
+_EMPTY_DF['_tag_mask'] = pd.Series(dtype=np.uint64)
+
+# Dates accepted by Transactions.search: yyyy-mm-dd
+_DATE_RE = re.compile(r'\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])')
+
+
 class TransactionsException(Exception):
     pass
 
 
+def _merge_tags(current: pd.Series, tags: list) -> pd.Series:
+    '''
+    Appends "tags" to each comma-separated value in "current", skipping the
+    tags a value already has.
+
+    Transactions share a handful of tag combinations, so the merge runs once per
+    distinct value and the results are mapped back to the rows.
+    '''
+    current = current.fillna('')
+    merged = {}
+    for value in pd.unique(current.to_numpy()):
+        have = [t for t in value.split(',') if t != '']
+        merged[value] = ','.join(have + [t for t in tags if t not in have])
+    return current.map(merged)
+
+
+def _as_mask(condition: pd.Series) -> np.ndarray:
+    '''
+    Returns a condition as a NumPy boolean array; rows where it's missing (as in
+    comparisons with nullable columns) are False.
+    '''
+    return condition.to_numpy(dtype=bool, na_value=False)
+
+
+def _validate_allot(total: float, orig_amount: float, orig_fee: float,
+                    amount: float, fee: float) -> tuple:
+    '''
+    Checks the amount and fee allotted from a transaction against its values.
+
+    The signs of "amount" and "fee" are set to match the original transaction's
+    (negative for expenses, positive for incomes).
+
+    Returns
+    -------
+    tuple (amount, fee, message, details); "message" and "details" are None if
+    the values are valid.
+    '''
+
+    # If it's an expense
+    if amount != 0 and total < 0:
+        amount = -abs(amount)
+        fee = -abs(fee)
+
+        # Amount + fee can't exceed the total
+        if (amount + fee) < total:
+            return (amount, fee,
+                    '"amount" and "fee" combined cannot exceed the total amount of the original transaction',
+                    f'amount: {amount}; fee {fee} -- original\'s total: {total}')
+
+        # Amount and fee have to be smaller than the original values
+        if amount < orig_amount or fee < orig_fee:
+            return (amount, fee,
+                    '"amount" and "fee" have to be smaller than in the original transaction',
+                    f'Received: amount: {amount}; fee {fee} -- Original: amount: {orig_amount}; fee: {orig_fee}')
+
+    # If it's an income
+    elif fee != 0 and total > 0:
+        amount = abs(amount)
+        fee = abs(fee)
+
+        # Amount + fee can't exceed the total
+        if (amount + fee) > total:
+            return (amount, fee,
+                    '"amount" and "fee" combined cannot exceed the total amount of the original transaction',
+                    f'Received: {amount} + fee {fee} = {amount+fee} -- Original\'s total: {total}')
+
+        # Amount and fee have to be smaller than the original values
+        if amount > orig_amount or fee > orig_fee:
+            return (amount, fee,
+                    '"amount" and "fee" have to be smaller than in the original transaction',
+                    f'Received: amount: {amount}; fee {fee} -- Original: amount: {orig_amount}; fee: {orig_fee}')
+
+    return amount, fee, None, None
+
+
 class Transactions:
     '''
     Provides an interface to manage the transactions.
@@ -22,6 +121,7 @@ class Transactions:
     def __new__(cls, cfg: Config, sources: Sources):
         if not hasattr(cls, 'instance'):
             cls.instance = super(Transactions, cls).__new__(cls)
+            cls.instance._initialized = False
         return cls.instance
 
     def __init__(self, cfg: Config, sources: Sources) -> None:
@@ -29,7 +129,13 @@ class Transactions:
         Loads the transactions database into a Pandas DataFrame, if the database
         exists. If not, it creates an empty DF with the set of columns defined in
         this class "header()" static method.
+
+        Being a Singleton, the database is loaded by the first instantiation
+        only; the next ones return the same, already loaded, object.
         '''
+        if self._initialized:
+            return
+
         self._df = None
 
         # 'Config' is a Singleton class. self._cfg attributes' values will update
@@ -40,11 +146,36 @@ class Transactions:
         # 'Sources' is a Singleton class too.
         self._sources = sources
 
+        # Bit of each tag (lower-cased) in the hidden '_tag_mask' column,
+        # assigned by order of appearance
+        self._tag_bits = {}
+
+        # Rows added by "add()" are buffered and sorting by time is deferred
+        # until the DataFrame is read (see "flush()"), so that a series of
+        # insertions is concatenated and sorted once.
+        self._pending = []
+        self._dirty = False
+
+        # Revision of the transactions, incremented by every change, so that
+        # results derived from them can be cached (see the "rev" property)
+        self._rev = 0
+
+        db_file = self._cfg.db_dir + 'transactions.parquet'
+
         try:
-            self._df = pd.read_csv(
-                self._cfg.db_dir + 'transactions.csv', sep='|')
+            if os.path.isfile(db_file):
+                # Memory-mapped, the compressed pages are read from the file
+                # mapping instead of being copied into read buffers first; they
+                # are still decompressed into new memory
+                self._df = pd.read_parquet(db_file, engine='pyarrow',
+                                           memory_map=True)
+            else:
+                # Databases saved before Parquet became the storage format are
+                # still CSV files; the next "save()" migrates them.
+                self._df = self._read_csv(
+                    self._cfg.db_dir + 'transactions.csv')
 
-            if self._df.columns.values.tolist() != Config.headers():
+            if not self._df.columns.equals(_HEADERS_INDEX):
                 raise TransactionsException(
                     "Exception: Transactions DB is corrupted. \n"
                     "\n"
@@ -53,27 +184,47 @@ class Transactions:
                     "\n"
                     "  Existing headers:\n"
                     "  {}\n"
-                    "\n".format(Config.headers(),
+                    "\n".format(_HEADERS,
                                 self._df.columns.values.tolist()))
 
         except FileNotFoundError:
-            self._df = pd.DataFrame(columns=Config.headers())
+            self._df = self._empty_df()
 
         except TransactionsException as e:
             print(str(e))
 
-        self._df['time'] = pd.to_datetime(self._df['time'])
-        self._df['allot'] = self._df['allot'].astype('Int64')
-        self._df['link'] = self._df['link'].astype('Int64')
+        # Hidden columns describing the tags of each transaction, so that
+        # searching by tags doesn't parse the strings on every call. They're
+        # not part of the database and aren't saved.
+        self._df = self._df.assign(**self._tags_columns(self._df['tags']))
 
-        # Check all the categories in the dataframe and update the categories
-        # list.
-        [cfg.add_new_category(str(c))
-         for c in self._df['category'].drop_duplicates()]
+        self._set_dtypes()
 
-        # Check all the tags in the dataframe and update the tags list
-        for line in self._df['tags'].drop_duplicates():
-            [cfg.add_new_tag(str(t)) for t in str(line).split(',')]
+        # Databases saved by older versions, or edited elsewhere, may not be
+        # sorted by time; the binary searches on 'time' require it, so such a
+        # database is sorted on the first flush.
+        self._dirty = not self._df['time'].is_monotonic_increasing
+
+        # Id for the next transaction added, so that new ids don't require
+        # scanning the 'id' column
+        ids = self._df['id']
+        self._next_id = int(ids.max()) + 1 if ids.notna().any() else 1
+
+        # The categories and tags in use are saved beside the database by
+        # "save()"; the DataFrame is only scanned for them when that file is
+        # missing or older than the database.
+        if not self._load_categories_tags(db_file):
+
+            # Check all the categories in the dataframe and update the
+            # categories list.
+            cfg.add_new_categories(
+                str(c) for c in self._df['category'].dropna().unique())
+
+            # Check all the tags in the dataframe and update the tags list
+            cfg.add_new_tags(','.join(pd.unique(
+                self._df['tags'].dropna().to_numpy())).split(','))
+
+        self._initialized = True
 
     @property
     def df(self):
@@ -85,6 +236,15 @@ class Transactions:
         raise TransactionsException(
             'Transactions DF can\'t be directly modified.')
 
+    @property
+    def rev(self):
+        return self._rev
+
+    @rev.setter
+    def rev(self, value):
+        raise TransactionsException(
+            '"rev" can\'t be modified')
+
     def add(self, time: str, timezone: str, type: str, source: Source, desc: str,
             amount: float, fee: float = 0.0, note: str = None,
             category: str = None, tags: list = []) -> StdReturn:
@@ -125,42 +285,37 @@ class Transactions:
 
         r = StdReturn(message="Transaction successfully updated")
 
-        df = pd.DataFrame(columns=Config.headers())
-
-        src = None
-        for s in self._sources.sources:
-            if s.name.lower() == source.lower():
-                src = s
+        src = self._sources.find_source(source)
 
         if src is None:
             r.success = False
             r.message = 'There is no "source" named {}.'.format(source)
             return r
 
-        df.loc[0, 'id'] = int(self._df['id'].max() + 1)
-        df['time'] = pd.to_datetime([time]).tz_localize(timezone).tz_convert(
-            self._cfg.local_timezone).tz_localize(None)
-        df['input'] = 'manual'
-        df['type'] = type
-        df['source'] = src.name
-        df['source_id'] = src.id
-        df['desc'] = desc
-        df['amount'] = amount
-        df['fee'] = fee
-        df['total'] = amount + fee
-        df['curr'] = src.currency
-
-        if note is not None:
-            df['note'] = note
+        # The id is assigned by "add_bulk()" when the row is flushed
+        row = {
+            'time': pd.Timestamp(time, tz=timezone).tz_convert(
+                self._cfg.local_timezone).tz_localize(None),
+            'input': 'manual',
+            'type': type,
+            'source': src.name,
+            'source_id': src.id,
+            'desc': desc,
+            'amount': amount,
+            'fee': fee,
+            'total': amount + fee,
+            'curr': src.currency,
+            'note': note
+        }
 
         if category is not None:
-            df['category'] = category
+            row['category'] = self._cfg.add_new_category(category)
 
         if tags is not None:
-            df['tags'] = ','.join([self._cfg.add_new_tag(tag) for tag in tags])
+            row['tags'] = ','.join([self._cfg.add_new_tag(tag) for tag in tags])
 
-        self._df = pd.concat([self._df, df], ignore_index=True)
-        self._sort()
+        self._pending.append(row)
+        self._rev += 1
 
         return r
 
@@ -182,25 +337,7 @@ class Transactions:
         -------
         StdReturn object with the return values.
         '''
-
-        r = StdReturn(message='Transaction DataFrames successfully combined.')
-
-        try:
-            for new_df in new_dfs:
-                self._df = new_df if self._df.empty else pd.concat(
-                    [self._df, new_df], ignore_index=True)
-            self._sort()
-
-            for i in range(0, len(self._df)):
-                if pd.isna(self._df.loc[i, 'id']) or self._df.loc[i, 'id'] == 0:
-                    self._df.loc[i, 'id'] = self._df['id'].max() + 1
-        except Exception as e:
-            r.success = False
-            r.message = 'Issue when combining the existing transactions with the new one'
-            r.details = 'Method: Transactions.add_bulk; exception: {}'.format(
-                e)
-
-        return r
+        return self._add_bulk(new_dfs)
 
     def allot(self, i: int, amount: float, fee: float, note: str = None,
               category: str = None, tags: list = None) -> StdReturn:
@@ -242,6 +379,10 @@ class Transactions:
         StdReturn
         '''
 
+        # Rows buffered by "add()" are combined first, so that "i" refers to
+        # the same transaction as the indexes returned by "search()"
+        self.flush()
+
         r = StdReturn(message='Allot successfull')
 
         # There are several restrictions for this operation. Since it decompose
@@ -253,63 +394,33 @@ class Transactions:
             r.details = f'amount: {amount}; fee {fee}'
             return r
 
-        # If it's an expense
-        if amount != 0 and self._df.loc[i]['total'] < 0:
-
-            if amount > 0:
-                amount *= -1
-            if fee > 0:
-                fee *= -1
-
-            # Amount + fee can't exceed the total
-            if (amount + fee) < self._df.loc[i]['total']:
-                r.success = False
-                r.message = '"amount" and "fee" combined cannot exceed the total amount of the original transaction'
-                r.details = f'amount: {amount}; fee {fee} -- original\'s total: {self._df.loc[i]["total"]}'
-                return r
-
-            # Amount and fee have to be smaller than the original values
-            if amount < self._df.loc[i]['amount'] or fee < self._df.loc[i]['fee']:
-                r.success = False
-                r.message = '"amount" and "fee" have to be smaller than in the original transaction'
-                r.details = f'Received: amount: {amount}; fee {fee} -- Original: amount: {self._df.loc[i]["amount"]}; fee: {self._df.loc[i]["fee"]}'
-                return r
-
-        # If it's an income
-        elif fee != 0 and self._df.loc[i]['total'] > 0:
-            if amount < 0:
-                amount *= -1
-            if fee < 0:
-                fee *= -1
+        # The original transaction, read once
+        row = self._df.loc[i].to_dict()
 
-            # Amount + fee can't exceed the total
-            if (amount + fee) > self._df.loc[i]['total']:
-                r.success = False
-                r.message = '"amount" and "fee" combined cannot exceed the total amount of the original transaction'
-                r.details = f'Received: {amount} + fee {fee} = {amount+fee} -- Original\'s total: {self._df.loc[i]["total"]}'
-                return r
+        amount, fee, message, details = _validate_allot(
+            float(row['total']), float(row['amount']), float(row['fee']),
+            float(amount), float(fee))
 
-            # Amount and fee have to be smaller than the original values
-            if amount > self._df.loc[i]['amount'] or fee > self._df.loc[i]['fee']:
-                r.success = False
-                r.message = '"amount" and "fee" have to be smaller than in the original transaction'
-                r.details = f'Received: amount: {amount}; fee {fee} -- Original: amount: {self._df.loc[i]["amount"]}; fee: {self._df.loc[i]["fee"]}'
-                return r
+        if message is not None:
+            r.success = False
+            r.message = message
+            r.details = details
+            return r
 
         # If the transaction at 'i' is part of an alloting, but it' not the main
         # one -- alloted transactions have the main transaction's id in the
         # 'allot' column; the main one has its own id.
-        if not pd.isna(self._df.loc[i]['allot']) and self._df.loc[i]['allot'] != self._df.loc[i]['id']:
+        if not pd.isna(row['allot']) and row['allot'] != row['id']:
             r.success = False
             r.message = 'The selected transaction is part of an alloting, but it\'s not the original one.'
-            r.details = f'The original transaction\' id is {self._df.loc[i]["allot"]}'
+            r.details = f'The original transaction\' id is {row["allot"]}'
             return r
 
-        category = self._df.loc[i]['category'] if category is None else self._cfg.add_new_category(
+        category = row['category'] if category is None else self._cfg.add_new_category(
             category)
 
         if tags is None:
-            tags = self._df.loc[i]['tags']
+            tags = row['tags']
         elif isinstance(tags, list):
             tags = ','.join([self._cfg.add_new_tag(tag) for tag in tags])
         else:
@@ -319,52 +430,50 @@ class Transactions:
             return r
 
         # Update the original transaction
-        self._df.loc[i, 'amount'] = self._df.loc[i]['amount'] - float(amount)
-        self._df.loc[i, 'fee'] = self._df.loc[i]['fee'] - fee
-        self._df.loc[i, 'total'] = self._df.loc[i]['amount'] + \
-            self._df.loc[i]['fee']
-        self._df.loc[i, 'allot'] = self._df.loc[i, 'id']
-
-        t = pd.DataFrame(columns=Config.headers())
-        t['time'] = self._df.loc[i]['time'],
-        t['input'] = 'manual',
-        t['type'] = self._df.loc[i]['type'],
-        t['source'] = self._df.loc[i]['source'],
-        t['source_id'] = self._df.loc[i]['source_id'],
-        t['desc'] = self._df.loc[i]['desc'],
-        t['amount'] = float(amount),
-        t['fee'] = float(fee),
-        t['total'] = float(amount + fee),
-        t['curr'] = self._df.loc[i]['curr'],
-        t['note'] = note,
-        t['allot'] = self._df.loc[i, 'id'],
-        t['link'] = self._df.loc[i, 'link']
-        t['category'] = category,
-        t['tags'] = tags
-
-        # Add the new transaction
-        add_return = self.add_bulk([t])
-
-        if not add_return.success:
-            r.success = False
-            r.message = 'Failed to add the new transaction to the existing database.'
-            r.details = add_return.details
+        orig_amount = row['amount'] - float(amount)
+        orig_fee = row['fee'] - fee
+        self._df.loc[i, ['amount', 'fee', 'total', 'allot']] = [
+            orig_amount, orig_fee, orig_amount + orig_fee, row['id']]
+
+        # The new transaction goes through the same buffer as "add()"
+        self._pending.append({
+            'time': row['time'],
+            'input': 'manual',
+            'type': row['type'],
+            'source': row['source'],
+            'source_id': row['source_id'],
+            'desc': row['desc'],
+            'amount': float(amount),
+            'fee': float(fee),
+            'total': float(amount + fee),
+            'curr': row['curr'],
+            'note': note,
+            'allot': row['id'],
+            'link': row['link'],
+            'category': category,
+            'tags': tags
+        })
+        self._rev += 1
 
         return r
 
     def backup(self) -> StdReturn:
         '''
-        Saves the current transactions database to a file named with a timestamp
+        Saves the current transactions database to a Parquet file named with a
+        timestamp. For a human-readable copy, see "export_csv()".
         '''
 
+        self.flush()
+
         filename = self._cfg.db_dir + 'transactions_' + datetime_for_filename() + \
-            '.csv'
+            '.parquet'
 
         r = StdReturn(message='Backup successful')
         r.details = filename
 
         try:
-            self._df.to_csv(filename, sep='|', index=False)
+            self._df[_HEADERS_INDEX].to_parquet(filename, engine='pyarrow',
+                                                  compression='zstd', index=False)
         except Exception as e:
             r.success = False
             r.message = 'Transactions backup failed.'
@@ -394,32 +503,34 @@ class Transactions:
         -------
         StdReturn object with the return values.
         '''
+        self.flush()
+
         r = StdReturn(message='Delete successful')
 
         additional_indexes = []
 
         for i in i_list:
             try:
-                if not pd.isna(self._df.loc[i, 'allot']):
+                allot_id = self._df.at[i, 'allot']
+                if not pd.isna(allot_id):
                     # If it's the original transaction of the apportioning, all
                     # the transactions in that 'allot' will be deleted
-                    if self._df.loc[i, 'allot'] == self._df.loc[i, 'id']:
+                    if allot_id == self._df.at[i, 'id']:
                         additional_indexes += list(self.search(
-                            allot=self._df.loc[i, 'allot']).index)
+                            allot=allot_id).index)
 
                     # It it's not the original transaction of the apportioning, only
                     # this transaction will be deleted and the amounts reverted to
                     # the origianl one
                     else:
-                        main_i = list(self.search(
-                            id=self._df.loc[i, 'allot']).index.values)
+                        main_i = list(self.search(id=allot_id).index.values)
 
                         # It has to confirm there is a transaction with that ID.
                         # There must be, but in case there was some issue it's a
                         # workaround
                         if len(main_i) > 0:
-                            self.update(index=main_i, amount=self._df.loc[i, 'amount'] + self._df.loc[main_i,
-                                        'amount'], fee=self._df.loc[i, 'fee'] + self._df.loc[main_i, 'fee'])
+                            self.update(index=main_i, amount=self._df.at[i, 'amount'] + self._df.loc[main_i,
+                                        'amount'], fee=self._df.at[i, 'fee'] + self._df.loc[main_i, 'fee'])
             except Exception as e:
                 r.success = False
                 r.message = 'Failed to delete transaction'
@@ -431,6 +542,7 @@ class Transactions:
 
         try:
             self._df = self._df.drop(index=i_list)
+            self._rev += 1
         except Exception as e:
             r.success = False
             r.message = 'Failed to delete transaction'
@@ -454,6 +566,8 @@ class Transactions:
         StdReturn object with the return values.
         '''
 
+        self.flush()
+
         r = StdReturn()
 
         duplicates = self._df.loc[self._df.drop(
@@ -470,12 +584,17 @@ class Transactions:
 
     def df_info(self) -> str:
 
+        self.flush()
+
+        # The hidden tag columns aren't part of the database
+        df = self._df[_HEADERS_INDEX]
+
         return (
             "TRANSACTIONS DF DETAILS\n\n"
             "DTYPES\n\n\n"
-            f"{self._df.dtypes}"
+            f"{df.dtypes}"
             "\n\n\nDESCRIBE\n"
-            f"{self._df.describe()}"
+            f"{df.describe()}"
         )
 
     def duplicated_mark_as_not(self, list_i: list) -> StdReturn:
@@ -495,9 +614,14 @@ class Transactions:
         StdReturn object with the return values.
         '''
 
+        self.flush()
+
         try:
-            self._df.loc[list_i, 'system'] = self._df.loc[list_i, 'system'].apply(
-                lambda x: '!dup' if pd.isna(x) or x == '' or x == '!dup' else f'{x},!dup')
+            system = self._df.loc[list_i, 'system']
+            unmarked = _as_mask(system.isna() | system.isin(['', '!dup']))
+            self._df.loc[list_i, 'system'] = np.where(
+                unmarked, '!dup', system.astype(str) + ',!dup')
+            self._rev += 1
         except Exception as e:
             return StdReturn(False, 'Failed to mark as not duplicated', f'Transactions.mark_as_not_duplicated - excpetion: {e}')
 
@@ -525,12 +649,14 @@ class Transactions:
         pd.DataFrame with the possible duplicated transactions
         '''
 
+        self.flush()
+
         # Get the duplicates based on a very few columns
         if exclude_marked:
             # It removes all the transactions where the 'system' column contains
             # '!dup'
-            possible_duplicates = self._df.drop(self._df[~pd.isna(self._df['system']) &
-                                                         self._df['system'].str.contains('!dup')].index)
+            possible_duplicates = self._df.loc[~self._df['system'].str.contains(
+                '!dup', regex=False, na=False)]
         else:
             possible_duplicates = self._df.loc[self._df.duplicated(
                 subset=['source_id', 'total', 'curr'], keep=False), :]
@@ -539,8 +665,8 @@ class Transactions:
         #  - Imported transactions may have a precise time while manually added
         #    may have the date only
         #  - It eliminates timezone differences (mostly)
-        possible_duplicates.loc[:, 'time'] = possible_duplicates.loc[:, 'time'].apply(
-            lambda x: x.date())
+        possible_duplicates = possible_duplicates.assign(
+            time=possible_duplicates['time'].dt.normalize())
 
         # Gets the index os the possible duplicates, but this time uses the time
         # column to filter also based on the date.
@@ -549,6 +675,80 @@ class Transactions:
 
         return self.search(index=indexes)
 
+    def export_csv(self, filename: str = None) -> StdReturn:
+        '''
+        Exports the transactions to a pipe-separated CSV file, human-readable.
+
+        Parameters
+        ----------
+        filename : str, optional, default=None
+            path to the file; when omitted, the file is created in the database
+            directory, named with a timestamp
+
+        Returns
+        -------
+        StdReturn object with the return values.
+        '''
+
+        self.flush()
+
+        if filename is None:
+            filename = self._cfg.db_dir + 'transactions_' + \
+                datetime_for_filename() + '.csv'
+
+        r = StdReturn(message='Transactions successfully exported')
+        r.details = filename
+
+        try:
+            self._to_csv(filename)
+        except Exception as e:
+            r.success = False
+            r.message = 'Transactions export failed.'
+            r.details = 'Method: Transactions.export_csv; exception: {}'.format(
+                e)
+
+        return r
+
+    def flush(self) -> StdReturn:
+        '''
+        Adds the transactions buffered by "add()" to the database, all at once,
+        and sorts it by time if needed.
+
+        It's called before the transactions are read, saved or looked up by
+        index to be changed.
+
+        Returns
+        -------
+        StdReturn object with the return values.
+        '''
+
+        r = StdReturn(message='Transactions flushed')
+
+        if len(self._pending) > 0:
+            r = self._add_bulk(
+                [pd.DataFrame(self._pending, columns=_HEADERS_INDEX)],
+                bump_rev=False)
+            if r.success:
+                self._pending.clear()
+
+        if self._dirty:
+            self._sort()
+
+        return r
+
+    def get_row(self, i: int) -> dict:
+        '''
+        Returns the transaction at index "i" as a dict, by header, or None if
+        there is no such index.
+        '''
+
+        self.flush()
+
+        if i not in self._df.index:
+            return None
+
+        return self._df.loc[i, _HEADERS_INDEX].to_dict()
+
     def link(self, list_i: list) -> StdReturn:
         '''
         It associates different transactions which provides a thorough view of 
@@ -573,6 +773,8 @@ class Transactions:
         StdReturn object with the return values.
         '''
 
+        self.flush()
+
         r = StdReturn()
 
         if len(list_i) < 2:
@@ -597,13 +799,16 @@ class Transactions:
 
         # Link transactions
         for i in list_i:
-            self._df.loc[i, 'link'] = int(id)
+            self._df.at[i, 'link'] = int(id)
 
             # If the transaction at 'i' is alloted, it will link all alloted
             # transactions.
-            if not pd.isna(self._df.loc[i, 'allot']):
-                self._df.loc[self._df['allot'] ==
-                             self._df.loc[i, 'allot'], 'link'] = int(id)
+            allot_id = self._df.at[i, 'allot']
+            if not pd.isna(allot_id):
+                self._df.loc[_as_mask(self._df['allot'] == allot_id),
+                             'link'] = int(id)
+
+        self._rev += 1
 
         r.message = 'Transactions successfully linked'
         r.details = '\n' + self.search(list_i)[['id', 'link']].to_string()
@@ -614,10 +819,12 @@ class Transactions:
         Print the number of rows in Transactions DataFrame defined in n_rows
         Print all columns
         '''
+        self.flush()
+
         with pd.option_context('display.min_rows', n_rows, 'display.max_rows', n_rows):
 
             if len(columns) == 0:
-                print(self._df)
+                print(self._df[_HEADERS_INDEX])
             else:
                 print(self._df[columns])
 
@@ -626,21 +833,31 @@ class Transactions:
         Backup the current database, then clean it up.
         '''
         self.backup()
-        self._df = pd.DataFrame(columns=Config.headers())
+        self._df = self._empty_df()
+        self._next_id = 1
+        self._rev += 1
 
     def save(self) -> None:
+        '''
+        Saves the transactions database as Parquet. CSV is kept for
+        "export_csv()" only, since it's human-readable.
+        '''
 
-        filename = self._cfg.db_dir + 'transactions.csv'
+        self.flush()
+
+        filename = self._cfg.db_dir + 'transactions.parquet'
 
         r = StdReturn(message='Transactions database successfully saved')
         r.details = filename
 
         try:
-            self._df.to_csv(filename, sep='|', index=False)
+            self._df[_HEADERS_INDEX].to_parquet(filename, engine='pyarrow',
+                                                  compression='zstd', index=False)
+            self._save_categories_tags()
         except Exception as e:
             r.success = False
-            r.message = 'Transactions backup failed.'
-            r.details = 'Method: Transactions.backup; exception: {}'.format(e)
+            r.message = 'Transactions save failed.'
+            r.details = 'Method: Transactions.save; exception: {}'.format(e)
 
         return r
 
@@ -659,7 +876,8 @@ class Transactions:
                allot: int | str = None,
                link: int | str = None,
                categories: str | list = None,
-               tags: str | list | int = None) -> pd.DataFrame:
+               tags: str | list | int = None,
+               columns: list = None) -> pd.DataFrame:
         '''
         Searchs for transactions which combine all the arguments values.
 
@@ -718,12 +936,23 @@ class Transactions:
             when "list", returns the transactions with the listed tags
             when "int", returns the transactions with the number of tags specified
                 (has to be > 0). For no tags, use an empty string ('')
+        columns: list
+            columns to return; all of them when omitted. It doesn't filter
+            anything by itself
 
         Returns
         -------
         Pandas Dataframe (None when the method was called with all arguments as None)
         '''
 
+        if all(arg is None for arg in (index, id, start_date, end_date, type,
+                                       source, description, total, currency,
+                                       note, system, allot, link, categories,
+                                       tags)):
+            return None
+
+        self.flush()
+
         s_df = self._df
 
         # INDEX
@@ -736,46 +965,60 @@ class Transactions:
                 raise TransactionsException(
                     '"index" has to be an integer or a list of integers; received "{}"'.format(index))
 
-        # INDEX
-        if id is not None:
-            s_df = s_df[(s_df['id'] == id)]
-
         # DATE
-        pattern = '^\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12][0-9]|3[01])$'
+        for date in (start_date, end_date):
+            if date is not None and not _DATE_RE.fullmatch(date):
+                raise TransactionsException(
+                    'The dates must be passed as yyyy-mm-dd; {} doesn\'t match or is not a valid date.'.format(date))
 
-        if start_date is not None and not re.search(pattern, start_date):
-            raise TransactionsException(
-                'The dates must be passed as yyyy-mm-dd; {} doesn\'t match or is not a valid date.'.format(start_date))
+        if start_date is not None:
+            # The dates are compared as timestamps: from the start date's
+            # midnight up to, but excluding, the midnight after the end date (or
+            # the start date, when there's no end date).
+            try:
+                start_ts = pd.Timestamp(start_date)
+                end_ts = pd.Timestamp(
+                    start_date if end_date is None else end_date) + pd.Timedelta(days=1)
+            except ValueError:
+                raise TransactionsException(
+                    'The dates must be passed as yyyy-mm-dd; {} or {} is not a valid date.'.format(start_date, end_date))
 
-        if end_date is not None and not re.search(pattern, end_date):
-            raise TransactionsException(
-                'The dates must be passed as yyyy-mm-dd; {} doesn\'t match or is not a valid date.'.format(end_date))
+            if s_df is self._df:
+                # The DataFrame is sorted by time, so the range boundaries are
+                # found by binary search and the rows in between are sliced.
+                start_i, end_i = s_df['time'].searchsorted([start_ts, end_ts])
+                s_df = s_df.iloc[start_i:end_i]
 
-        if start_date is not None and end_date is None:
-            s_df = s_df[(s_df['time'].dt.strftime('%Y-%m-%d') == start_date)]
-        elif start_date is not None and end_date is not None:
-            s_df = s_df[(s_df['time'].dt.strftime(
-                '%Y-%m-%d') >= start_date) & (s_df['time'].dt.strftime('%Y-%m-%d') <= end_date)]
+        # The remaining filters are combined into a single mask over the rows
+        # selected so far, so that the rows are copied once, at the end.
+        mask = np.ones(len(s_df), dtype=bool)
+
+        # DATE, on rows selected by index: compared as int64 nanoseconds (NaT
+        # is the lowest int64, so it's out of any range)
+        if start_date is not None and index is not None:
+            times = s_df['time'].to_numpy().view('int64')
+            mask &= (times >= start_ts.value) & (times < end_ts.value)
+
+        # ID
+        if id is not None:
+            mask &= _as_mask(s_df['id'] == id)
 
         # TYPE
         if type is not None:
             if type == '*':
-                s_df = s_df.dropna(subset=['type'])
+                mask &= _as_mask(s_df['type'].notna())
             else:
-                s_df = s_df[(s_df['type'] == type)]
+                mask &= _as_mask(s_df['type'] == type)
 
         # SOURCE
         if source is not None:
-            src = None
-            for s in self._sources.sources:
-                if s.name.lower() == source.lower():
-                    src = s.id
+            src = self._sources.find_source(source)
 
             if src is None:
                 raise TransactionsException(
                     'There is no "source" named {}.'.format(source))
 
-            s_df = s_df[(s_df['source_id'] == src)]
+            mask &= _as_mask(s_df['source_id'] == src.id)
 
         # DESCRIPTION
         if description is not None:
@@ -785,20 +1028,19 @@ class Transactions:
             #
             # If it's "*", it's enought to drop the NaN;
             # if not, it will search for the string.
-            s_df = s_df.dropna(subset=['desc'])
+            mask &= _as_mask(s_df['desc'].notna())
 
             if description != '*':
                 description = str(description)
-                s_df = s_df.loc[s_df['desc'].str.contains(
-                    description, case=False)]
+                mask[mask] = self._contains(s_df['desc'][mask], description)
 
         # TOTAL
         if total is not None:
-            s_df = s_df.loc[s_df['total'] == total]
+            mask &= _as_mask(s_df['total'] == total)
 
         # CURRENCY
         if currency is not None:
-            s_df = s_df[(s_df['curr'] == currency)]
+            mask &= _as_mask(s_df['curr'] == currency)
 
         # NOTE
         if note is not None:
@@ -808,47 +1050,47 @@ class Transactions:
             #
             # If it's "*", it's enought to drop the NaN;
             # if not, it will search for the string.
-            s_df = s_df.dropna(subset=['note'])
+            mask &= _as_mask(s_df['note'].notna())
 
             if note != '*':
                 note = str(note)
-                s_df = s_df.loc[s_df['note'].str.contains(note, case=False)]
+                mask[mask] = self._contains(s_df['note'][mask], note)
 
         # SYSTEM
         if system is not None:
             if system == '':
-                s_df = s_df[s_df['system'].isna()]
+                mask &= _as_mask(s_df['system'].isna())
             elif system == '*':
-                s_df = s_df.dropna(subset=['system'])
+                mask &= _as_mask(s_df['system'].notna())
             else:
-                s_df = s_df[(s_df['system'] == system)]
+                mask &= _as_mask(s_df['system'] == system)
 
         # ALLOT
         if allot is not None:
             if allot == '':
-                s_df = s_df[s_df['allot'].isna()]
+                mask &= _as_mask(s_df['allot'].isna())
             elif allot == '*':
-                s_df = s_df.dropna(subset=['allot'])
+                mask &= _as_mask(s_df['allot'].notna())
             else:
-                s_df = s_df[(s_df['allot'] == allot)]
+                mask &= _as_mask(s_df['allot'] == allot)
 
         # LINK
         if link is not None:
             if link == '':
-                s_df = s_df[s_df['link'].isna()]
+                mask &= _as_mask(s_df['link'].isna())
             elif link == '*':
-                s_df = s_df.dropna(subset=['link'])
+                mask &= _as_mask(s_df['link'].notna())
             else:
-                s_df = s_df[(s_df['link'] == link)]
+                mask &= _as_mask(s_df['link'] == link)
 
         # CATEGORY
         if categories is not None:
 
             if isinstance(categories, str) and categories == '':
-                s_df = s_df[s_df['category'].isna()]
+                mask &= _as_mask(s_df['category'].isna())
             else:
 
-                s_df = s_df.dropna(subset=['category'])
+                mask &= _as_mask(s_df['category'].notna())
 
                 if isinstance(categories, str):
 
@@ -862,20 +1104,19 @@ class Transactions:
                             raise TransactionsException(
                                 'There is no category named "{}"'.format(categories))
                         else:
-                            s_df = s_df[s_df['category'] ==
-                                        categories.lower().capitalize()]
+                            mask &= _as_mask(s_df['category'] ==
+                                             categories.lower().capitalize())
 
                 elif isinstance(categories, list):
 
-                    for cat in categories:
-                        if cat.lower().capitalize() not in self._cfg.categories:
-                            raise TransactionsException(
-                                'There is no category named "{}"'.format(cat))
-
-                    findings = [s_df.loc[s_df['category'].str.contains(
-                        cat, case=False)] for cat in categories]
+                    wanted = {cat.lower().capitalize() for cat in categories}
+                    unknown = wanted - set(self._cfg.categories)
+                    if unknown:
+                        raise TransactionsException(
+                            'There is no category named "{}"'.format(
+                                '", "'.join(sorted(unknown))))
 
-                    s_df = pd.concat(findings)
+                    mask &= _as_mask(s_df['category'].isin(wanted))
                 else:
                     raise TransactionsException(
                         '"categoris" has to be a list of strings or a single string (may be empty); received "{}"'.format(categories))
@@ -884,25 +1125,22 @@ class Transactions:
         if tags is not None:
 
             if isinstance(tags, str) and tags == '':
-                s_df = s_df[s_df['tags'].isna()]
+                mask &= _as_mask(s_df['tags'].isna())
 
             else:
-                s_df = s_df.dropna(subset=['tags'])
+                mask &= _as_mask(s_df['tags'].notna())
 
                 # Searching for tags in a list
                 if isinstance(tags, list):
 
-                    for tag in tags:
-                        if tag.lower().capitalize() not in self._cfg.tags:
-                            raise TransactionsException(
-                                'There is no tag named "{}"'.format(tag))
-
-                    print(tags)
+                    unknown = {tag.lower().capitalize() for tag in tags} - \
+                        set(self._cfg.tags)
+                    if unknown:
+                        raise TransactionsException(
+                            'There is no tag named "{}"'.format(
+                                '", "'.join(sorted(unknown))))
 
-                    findings = [s_df.loc[s_df['tags'].str.contains(
-                        t, case=False)] for t in tags]
-
-                    s_df = pd.concat(findings)
+                    mask &= self._has_tags(s_df, tags)
 
                 # Searching for a single tag
                 elif isinstance(tags, str):
@@ -911,22 +1149,289 @@ class Transactions:
                         # the empty ones have already been removed.
                         pass
                     else:
-                        s_df = s_df.loc[s_df['tags'].str.contains(
-                            tags, case=False)]
+                        mask &= self._has_tags(s_df, [tags])
 
                 # Searching for transactions with a specific number of tags
                 elif isinstance(tags, int) and tags > 0:
-                    s_df = s_df.loc[s_df['tags'].str.count(',') == tags - 1]
+                    mask &= _as_mask(s_df['_ntags'] == tags)
 
                 else:
                     raise TransactionsException(
                         '"tags" has to be a list of strings, a single string, or an integer > 0; received "{}"'.format(tags))
 
-        return s_df if s_df is not self._df else None
+        if columns is None:
+            columns = _HEADERS_INDEX
+        elif not set(columns) <= set(_HEADERS):
+            raise TransactionsException(
+                'Unknown columns: {}'.format(sorted(set(columns) - set(_HEADERS))))
+        else:
+            # A tuple would be taken by ".loc" as a single (MultiIndex) label
+            columns = list(columns)
+
+        return s_df.loc[mask, columns]
+
+    def _add_bulk(self, new_dfs: list, bump_rev: bool = True) -> StdReturn:
+        '''
+        Implements "add_bulk()". "flush()" combines rows whose change was
+        already counted by "add()" or "allot()", so it doesn't bump the
+        revision again.
+        '''
+
+        r = StdReturn(message='Transaction DataFrames successfully combined.')
+
+        try:
+            new_dfs = list(new_dfs)
+            new_df = new_dfs[0] if len(new_dfs) == 1 else pd.concat(
+                new_dfs, ignore_index=True, copy=False)
+
+            # New transactions get the ids following the highest one, numbered
+            # by time, as they'd be once sorted into the database. Only the new
+            # rows are checked for missing ids; the database has them all.
+            new_df = new_df.sort_values(by=['time'], ignore_index=True,
+                                        kind='mergesort')
+            new_ids = pd.Series(new_df['id'], dtype='Int64')
+            missing = (new_ids.isna() | (new_ids == 0)).to_numpy(
+                dtype=bool, na_value=True)
+            n_missing = int(missing.sum())
+            next_id = self._next_id
+            if n_missing:
+                new_ids[missing] = np.arange(next_id, next_id + n_missing)
+            if new_ids.notna().any():
+                next_id = max(next_id, int(new_ids.max()) + 1)
+            new_df = new_df.assign(
+                id=new_ids, **self._tags_columns(new_df['tags']))
+
+            # Concatenating to an empty DataFrame would only copy the new ones;
+            # the columns are reindexed to keep the database's columns order.
+            # New rows added to a sorted list are merged into their positions;
+            # otherwise, they're appended and sorted on the next flush.
+            if self._df.empty:
+                self._df = new_df.reindex(columns=self._df.columns,
+                                          copy=False)
+                self._dirty = True
+            elif not self._dirty:
+                self._merge_sorted(new_df)
+            else:
+                self._df = pd.concat([self._df, new_df],
+                                     ignore_index=True, copy=False)
+                self._dirty = True
+            self._set_dtypes()
+            self._next_id = next_id
+            if bump_rev:
+                self._rev += 1
+        except Exception as e:
+            r.success = False
+            r.message = 'Issue when combining the existing transactions with the new one'
+            r.details = 'Method: Transactions.add_bulk; exception: {}'.format(
+                e)
+
+        return r
+
+    @staticmethod
+    def _empty_df() -> pd.DataFrame:
+        '''Returns an empty transactions DataFrame with the columns dtypes set'''
+        return _EMPTY_DF.copy()
+
+    def _set_dtypes(self) -> None:
+        '''
+        Casts the columns whose dtypes differ from Config.dtypes(). Needed after
+        loading and concatenating: the low-cardinality columns are categoricals
+        (filtering them compares integer codes instead of Python strings), but
+        concatenation falls back to "object" when the categories differ.
+        '''
+        for col, dtype in _DTYPES.items():
+            if self._df[col].dtype != dtype:
+                self._df[col] = self._df[col].astype(dtype)
+
+    def _set_value(self, i, col: str, value) -> None:
+        '''
+        Sets "value" to the column "col" at the index(es) "i". Categorical
+        columns only accept known categories, so a new value is registered as a
+        category before.
+        '''
+        column = self._df[col]
+        if isinstance(column.dtype, pd.CategoricalDtype) and not pd.isna(value) \
+                and value not in column.cat.categories:
+            self._df[col] = column.cat.add_categories([value])
+        self._df.loc[i, col] = value
+
+    def _load_categories_tags(self, db_file: str) -> bool:
+        '''
+        Adds the categories and tags listed in "categories_tags.json" to the
+        configuration. Returns False if the file is missing, unreadable or
+        older than the database, in which case nothing is added.
+        '''
+        filename = self._cfg.db_dir + 'categories_tags.json'
+
+        try:
+            if os.path.getmtime(filename) < os.path.getmtime(db_file):
+                return False
+
+            with open(filename, 'r') as f:
+                sets = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        self._cfg.add_new_categories(sets['categories'])
+        self._cfg.add_new_tags(sets['tags'])
+
+        return True
+
+    def _save_categories_tags(self) -> None:
+        with open(self._cfg.db_dir + 'categories_tags.json', 'w') as f:
+            f.write(json.dumps({'categories': sorted(self._cfg.categories),
+                                'tags': sorted(self._cfg.tags)}, indent=4))
+
+    @staticmethod
+    def _contains(strings: pd.Series, substring: str) -> np.ndarray:
+        '''
+        Case-insensitive search of a literal substring on a column of strings.
+        PyArrow's matcher runs over the whole array in C++.
+        '''
+        return pc.match_substring(
+            pa.array(strings, type=pa.string()), substring,
+            ignore_case=True).to_numpy(zero_copy_only=False)
+
+    @staticmethod
+    def _read_csv(filename: str) -> pd.DataFrame:
+        '''
+        Reads a pipe-separated transactions CSV file.
+
+        PyArrow's reader parses the file with multiple threads and the column
+        types fixed up front.
+        '''
+        # PyArrow reports a missing file with its own exception type
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(filename)
+
+        # The integer columns are read as floats: pandas writes a column with
+        # missing values as floats ("1.0"), which an integer type rejects.
+        # "_set_dtypes()" casts them back to 'Int64'.
+        types = {'id': pa.float64(),
+                 'time': pa.timestamp('ns'),
+                 'source_id': pa.float64(),
+                 'amount': pa.float64(),
+                 'fee': pa.float64(),
+                 'total': pa.float64(),
+                 'allot': pa.float64(),
+                 'link': pa.float64()}
+
+        table = pacsv.read_csv(
+            filename,
+            read_options=pacsv.ReadOptions(use_threads=True,
+                                           block_size=8 << 20),
+            parse_options=pacsv.ParseOptions(delimiter='|'),
+            convert_options=pacsv.ConvertOptions(
+                column_types={h: types.get(h, pa.string()) for h in _HEADERS},
+                strings_can_be_null=True))
+
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+
+    def _to_csv(self, filename: str) -> None:
+        '''
+        Writes the transactions DataFrame to a pipe-separated CSV file.
+
+        PyArrow's writer formats the columns in C.
+        '''
+        table = pa.Table.from_pandas(self._df, columns=_HEADERS,
+                                     preserve_index=False)
+        # Categorical columns become dictionary arrays in Arrow; they're
+        # written as their plain values.
+        table = pa.table([c.cast(c.type.value_type)
+                          if pa.types.is_dictionary(c.type) else c
+                          for c in table.columns],
+                         names=table.column_names)
+        pacsv.write_csv(table, filename,
+                        write_options=pacsv.WriteOptions(delimiter='|'))
+
+    def _tags_columns(self, tags: pd.Series) -> dict:
+        '''
+        Returns the hidden columns describing the comma-separated "tags" values:
+
+        - '_ntags': number of tags
+        - '_tag_mask': mask with the bits of the tags set (see "_tag_bits");
+          uint64 while there are up to 64 tags, Python integers beyond that
+
+        Transactions share a handful of tag combinations, so each distinct value
+        is parsed once.
+        '''
+        tags = tags.astype(object).fillna('')
+        counts = {}
+        masks = {}
+        for value in pd.unique(tags.to_numpy()):
+            names = [t for t in value.split(',') if t != '']
+            mask = 0
+            for name in names:
+                mask |= 1 << self._tag_bits.setdefault(name.lower(),
+                                                       len(self._tag_bits))
+            counts[value] = len(names)
+            masks[value] = mask
+
+        dtype = np.uint64 if len(self._tag_bits) <= 64 else object
+        if dtype is object and '_tag_mask' in self._df \
+                and self._df['_tag_mask'].dtype != object:
+            self._df['_tag_mask'] = self._df['_tag_mask'].astype(object)
+
+        return {'_ntags': tags.map(counts).astype(int),
+                '_tag_mask': tags.map(masks).astype(dtype)}
+
+    def _has_tags(self, df: pd.DataFrame, tags: list) -> np.ndarray:
+        '''
+        Returns a boolean array telling which rows of "df" have any of "tags"
+        '''
+        wanted = 0
+        for t in tags:
+            if t.lower() in self._tag_bits:
+                wanted |= 1 << self._tag_bits[t.lower()]
+
+        masks = df['_tag_mask'].to_numpy()
+        if masks.dtype == object:
+            # Beyond 64 tags the masks are Python integers; each distinct mask
+            # is tested once instead of every row
+            unique, inverse = np.unique(masks, return_inverse=True)
+            return ((unique & wanted) != 0).astype(bool)[inverse]
+
+        return (masks & np.uint64(wanted)) != 0
+
+    def _merge_sorted(self, new_df: pd.DataFrame) -> None:
+        '''
+        Merges "new_df" into the DataFrame, which is sorted by time, keeping it
+        sorted: only the new rows are sorted, and their positions are found by
+        binary search. Rows with the same time go after the existing ones.
+        '''
+        if len(new_df) == 1:
+            pos = np.searchsorted(self._df['time'].values,
+                                  pd.to_datetime(new_df['time']).values[0],
+                                  side='right')
+            self._df = pd.concat(
+                [self._df.iloc[:pos], new_df, self._df.iloc[pos:]],
+                ignore_index=True, copy=False)
+            return
+
+        new_df = new_df.sort_values(by=['time'], ignore_index=True,
+                                    kind='mergesort')
+        n_old, n_new = len(self._df), len(new_df)
+
+        # Final position of each new row: where it goes among the existing
+        # rows, shifted by the new rows before it
+        new_pos = np.searchsorted(self._df['time'].values,
+                                  pd.to_datetime(new_df['time']).values,
+                                  side='right') + np.arange(n_new)
+
+        order = np.empty(n_old + n_new, dtype=np.intp)
+        is_new = np.zeros(n_old + n_new, dtype=bool)
+        is_new[new_pos] = True
+        order[new_pos] = np.arange(n_old, n_old + n_new)
+        order[~is_new] = np.arange(n_old)
+
+        self._df = pd.concat([self._df, new_df], ignore_index=True,
+                             copy=False).take(order).reset_index(drop=True)
 
     def _sort(self) -> None:
-        self._df.sort_values(by=['time'], inplace=True)
-        self._df.reset_index(inplace=True, drop=True)
+        # Mergesort is stable and close to linear on the mostly sorted frame
+        self._df = self._df.sort_values(by=['time'], ignore_index=True,
+                                        kind='mergesort')
+        self._dirty = False
 
     def update(self, index: list = None,
                search_result: pd.DataFrame = None,
@@ -942,6 +1447,8 @@ class Transactions:
                tags: list = None,
                overwrite_tags: bool = True) -> dict:
 
+        self.flush()
+
         r = StdReturn(message="Transaction successfully updated")
 
         if index is None and search_result is None:
@@ -978,29 +1485,29 @@ class Transactions:
                 r.message = 'The search passed as parameter didn\'t return any transaction, thus the program had nothing to update.'
                 return r
 
+        self._rev += 1
+
         if time is not None:
             # The time has to be validated and converted to the timezone before
             self._df.loc[i, 'time'] = time
+            self._dirty = True
 
-        self._df.loc[i, 'input'] = 'updated'
+        self._set_value(i, 'input', 'updated')
 
         if type is not None:
-            self._df.loc[i, 'desc'] = type
+            self._set_value(i, 'type', type)
 
         if source is not None:
-            source_obj = None
-
-            for s in self._sources.sources:
-                if source.lower() == s.name.lower():
-                    source_obj = s
+            source_obj = self._sources.find_source(source)
 
             if source_obj is None:
                 r.success = False
                 r.message = 'There is no source named "{}". Please, register this source first.'.format(
                     source)
+                return r
 
-            self._df.loc[i, 'source'] = source_obj.name
-            self._df.loc[i, 'source_id'] = source_obj.id
+            self._set_value(i, 'source', source_obj.name)
+            self._set_value(i, 'source_id', source_obj.id)
 
         if description is not None:
             self._df.loc[i, 'desc'] = description
@@ -1012,8 +1519,8 @@ class Transactions:
             self._df.loc[i, 'fee'] = fee
 
         if amount is not None or fee is not None:
-            self._df.loc[i, 'total'] = self._df.loc[i]['amount'] + \
-                self._df.loc[i]['fee']
+            self._df.loc[i, 'total'] = self._df.loc[i, 'amount'] + \
+                self._df.loc[i, 'fee']
 
         if note is not None:
             self._df.loc[i, 'note'] = note
@@ -1023,17 +1530,21 @@ class Transactions:
 
         if category is not None:
             category = self._cfg.add_new_category(category)
-            self._df.loc[i, 'category'] = category
+            self._set_value(i, 'category', category)
 
         if tags is not None:
-            tags = [self._cfg.add_new_tag(tag) for tag in tags]
-
-            self._df.loc[i, 'tags'] = self._df.loc[i, 'tags'].apply(
-                lambda r:
-                ','.join(tags) if overwrite_tags or pd.isna(r['tags'])
-                else
-                ','.join(r['tags'].split(','))
-                + [t for t in tags if t not in r['tags']]
-            )
+            # The web form sends the tags as a comma-separated string
+            if isinstance(tags, str):
+                tags = tags.split(',')
+            tags = list(dict.fromkeys(self._cfg.add_new_tag(tag.strip())
+                                      for tag in tags if tag.strip() != ''))
+
+            if overwrite_tags:
+                self._df.loc[i, 'tags'] = ','.join(tags)
+            else:
+                self._df.loc[i, 'tags'] = _merge_tags(
+                    self._df.loc[i, 'tags'], tags)
+            for col, values in self._tags_columns(self._df.loc[i, 'tags']).items():
+                self._df.loc[i, col] = values
 
         return r
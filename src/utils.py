@@ -1,4 +1,4 @@
-from datetime import datetime
+import time
 
 
 class UtilsException(Exception):
@@ -10,6 +10,8 @@ class StdReturn:
     Structure to keep the functions and methods return consistent
     '''
 
+    __slots__ = ('_success', 'message', 'details')
+
     def __init__(self, success: bool = True, message: str = None, details: str = None) -> None:
         '''
         '''
@@ -23,10 +25,9 @@ class StdReturn:
 
     @success.setter
     def success(self, value):
-        if value is True or value is False:
-            self._success = value
-        else:
+        if not isinstance(value, bool):
             raise UtilsException('"success" accepts only "True" or "False"')
+        self._success = value
 
     def __str__(self) -> str:
         return (
@@ -36,4 +37,4 @@ class StdReturn:
 
 
 def datetime_for_filename() -> str:
-    return datetime.now().strftime(('%Y-%m-%d_%H-%M-%S'))
+    return time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime())
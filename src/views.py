@@ -1,19 +1,145 @@
+import atexit
+import threading
+import time
 import pandas as pd
-import json
-from datetime import datetime
 
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, session, abort
 
 from config import Config
 from sources import Sources
 from transactions import Transactions
 
+# With copy-on-write, pandas copies data only when it's modified, instead of
+# the defensive copies of column selections and slices
+pd.set_option('mode.copy_on_write', True)
+
 views = Blueprint(__name__, 'views')
 
 
-cfg = Config('../data/db')
-s = Sources(cfg)
-t = Transactions(cfg, s)
+# The configuration, sources and transactions are loaded by the first request
+# that needs them, not when the module is imported (e.g. by the reloader). The
+# server is threaded; the lock keeps concurrent first requests from loading
+# them twice.
+_ctx = {}
+_ctx_lock = threading.Lock()
+
+
+def _get_ctx() -> dict:
+    if not _ctx:
+        with _ctx_lock:
+            if not _ctx:
+                c = Config('../data/db')
+                srcs = Sources(c)
+                tx = Transactions(c, srcs)
+                _ctx.update(cfg=c, s=srcs, t=tx, saved_rev=tx.rev)
+
+                # Started once the context they save is filled
+                threading.Thread(target=_autosave, daemon=True).start()
+                atexit.register(_save_changes)
+    return _ctx
+
+
+# Changes made through the views are applied in memory and saved by a
+# background thread, at most every _SAVE_INTERVAL seconds, and at exit; the
+# lock keeps a save from running in the middle of an update.
+_SAVE_INTERVAL = 5
+_lock = threading.Lock()
+
+
+def _save_changes() -> None:
+    t = _ctx['t']
+    with _lock:
+        rev = t.rev
+        if rev != _ctx['saved_rev'] and t.save().success:
+            _ctx['saved_rev'] = rev
+
+
+def _autosave() -> None:
+    while True:
+        time.sleep(_SAVE_INTERVAL)
+        _save_changes()
+
+
+# Last transactions page, keyed by the search dates and the transactions
+# revision; any change in the transactions makes it stale.
+_search_cache = {}
+
+
+def _recent_transactions(start_date: str, end_date: str) -> list:
+    t = _get_ctx()['t']
+    key = (start_date, end_date, t.rev)
+
+    # Another request may clear the cache at any time, so the rows are read
+    # from it once and returned from the local reference
+    rows = _search_cache.get(key)
+
+    if rows is None:
+        # The page shows the first 200 transactions; only those are prepared.
+        # "search()" returns them sorted by time.
+        with _lock:
+            df = t.search(start_date=start_date, end_date=end_date,
+                          columns=Config.public_headers()).head(200).copy()
+
+        # Missing values are shown as ''. The columns are taken as object
+        # arrays and filled through a mask; the arrays are copies, since
+        # copy-on-write may return read-only views of the DataFrame's data.
+        for col in ('category', 'tags', 'note'):
+            values = df[col].to_numpy(dtype=object, copy=True)
+            missing = pd.isna(values)
+            if missing.any():
+                values[missing] = ''
+            df[col] = values
+
+        # The parts of the time shown by the template, formatted by column
+        # rather than by strftime calls for every row in the template
+        times = df['time'].dt
+        df = df.assign(date=times.strftime('%Y-%m-%d'),
+                       time_only=times.strftime('%H:%M'),
+                       day=times.strftime('%d'),
+                       month=times.strftime('%b'),
+                       year=times.strftime('%Y'),
+                       year_short=times.strftime('%y'),
+                       hour=times.strftime('%H'),
+                       min=times.strftime('%M'))
+
+        # Rows for the template as (index, record) pairs, built from the
+        # columns' lists instead of boxing a Series per row (as "iterrows()")
+        cols = df.columns.tolist()
+        rows = list(zip(df.index.tolist(),
+                        (dict(zip(cols, values))
+                         for values in zip(*(df[c].tolist() for c in cols)))))
+
+        _search_cache.clear()
+        _search_cache[key] = rows
+
+    return rows
+
+
+# Rendered transactions pages, keyed like "_search_cache"
+_page_cache = {}
+
+
+def _render_transactions(start_date: str, end_date: str) -> str:
+    ctx = _get_ctx()
+    cfg, t = ctx['cfg'], ctx['t']
+    key = (start_date, end_date, t.rev)
+
+    # Flashed messages are shown once, so a page with them isn't cached
+    if '_flashes' in session:
+        return render_template('transactions.html', app_name=cfg.app_name,
+                               rows=_recent_transactions(start_date, end_date))
+
+    # Read once, as in "_recent_transactions()"
+    html = _page_cache.get(key)
+
+    if html is None:
+        html = render_template(
+            'transactions.html', app_name=cfg.app_name,
+            rows=_recent_transactions(start_date, end_date))
+        _page_cache.clear()
+        _page_cache[key] = html
+
+    return html
 
 
 @views.route('/')
@@ -23,54 +149,55 @@ def root():
 
 @views.route('/home')
 def home():
+    cfg = _get_ctx()['cfg']
     return render_template('index.html', app_name=cfg.app_name)
 
 
 @views.route('/transactions', methods=['GET', 'POST'])
 def transactions():
+    t = _get_ctx()['t']
 
     if request.method == 'POST':
-        if request.form['action'] == 'k_trx_edit_save':
-            data = request.form
-            print("This is 'request.form'")
-            print(data)
-
-            t.update(
-                index=int(request.form.get('index')),
-                time=request.form.get('date') + ' ' + request.form.get('time'),
-                type=request.form.get('type'),
-                source=request.form.get('src'),
-                description=request.form.get('desc'),
-                amount=float(request.form.get('amount')),
-                fee=float(request.form.get('fee')),
-                note=request.form.get('note'),
-                category=request.form.get('category'),
-                tags=request.form.get('tags'),
-                overwrite_tags=True
-            )
-
-        elif request.POST['action'] == 'k_trx_spread_save':
+        f = request.form
+
+        if f['action'] == 'k_trx_edit_save':
+            with _lock:
+                t.update(
+                    index=int(f['index']),
+                    time=f'{f["date"]} {f["time"]}',
+                    type=f['type'],
+                    source=f['src'],
+                    description=f['desc'],
+                    amount=float(f['amount']),
+                    fee=float(f['fee']),
+                    note=f['note'],
+                    category=f['category'],
+                    tags=f['tags'],
+                    overwrite_tags=True
+                )
+
+        elif f['action'] == 'k_trx_spread_save':
             pass
-        elif request.POST['action'] == 'k_trx_extend_save':
+        elif f['action'] == 'k_trx_extend_save':
             pass
 
     # After processing the POST,PUT requests, it always returns the last search
-    df = t.search(
-        start_date='2018-07-13',
-        end_date='2023-10-31'
-    )
-
-    df[['category', 'tags', 'note']] = df[[
-        'category', 'tags', 'note']].fillna('')
-
-    return render_template('transactions.html', app_name=cfg.app_name, dataframe=df.head(200))
+    return _render_transactions('2018-07-13', '2023-10-31')
 
 
 @views.route('/spread')
 def spread():
+    ctx = _get_ctx()
+    cfg, t = ctx['cfg'], ctx['t']
+
+    index = request.args.get('index', type=int)
+    if index is None:
+        abort(400)
 
-    index = request.args.get('index')
+    with _lock:
+        row = t.get_row(index)
 
-    df = t.search(index=[int(index)])
+    if row is None:
+        abort(404)
 
-    return render_template('transaction_spread.html', app_name=cfg.app_name, index=index, df=df.to_dict(orient='records'))
+    return render_template('transaction_spread.html', app_name=cfg.app_name, index=index, df=[row])